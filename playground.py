@@ -1,35 +1,57 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
-from overpack import Vpk, DataComponent, ConfigurationComponent
+from overpack import Component, Vpk, available_cpu_count
+
+
+def regenerate(c: Component):
+    c.regenerate(
+        object_name="object_name_placeholder",
+        data_type="Object",
+        action="Create",
+    )
 
 
 def f(vpk_path: Path, out_dir: Path) -> Path:
-    vpk = Vpk.load(vpk_path)
-    for c in vpk.components:
-        if isinstance(c, ConfigurationComponent):
-            c.generate_md5()
-        elif isinstance(c, DataComponent):
-            c.generate_manifest(
-                object_name="object_name_placeholder",
-                data_type="Object",
-                action="Create",
-            )
-    rp = out_dir / (vpk_path.name if vpk_path.is_file() else f"{vpk_path.stem}.vpk2")
-    vpk.dump(rp)
+    if vpk_path.is_file():
+        # Single pass: only the components get parsed and re-serialized
+        rp = out_dir / vpk_path.name
+        Vpk.transform(vpk_path, rp, regenerate)
+    else:
+        rp = out_dir / f"{vpk_path.stem}.vpk2"
+        vpk = Vpk.load(vpk_path)
+        for c in vpk.components:
+            regenerate(c)
+        vpk.dump(rp)
     print(f"Wrote {rp}")
     return rp
 
 
-vpk_files = [
-    p
-    for p in Path("./tests/vpk_examples/").iterdir()
-    if (p.suffix == ".vpk") or p.is_dir()
-]
-out_dir = Path("/tmp/vpk_playground")
-out_dir.mkdir(exist_ok=True)
-max_workers = len(vpk_files)
-with ThreadPoolExecutor(max_workers=max_workers) as executor:
-    futures = [executor.submit(f, p, out_dir) for p in vpk_files]
-    for future in as_completed(futures):
-        future.result()
+if __name__ == "__main__":
+    vpk_files = [
+        p
+        for p in Path("./tests/vpk_examples/").iterdir()
+        if (p.suffix == ".vpk") or p.is_dir()
+    ]
+    out_dir = Path("/tmp/vpk_playground")
+    out_dir.mkdir(exist_ok=True)
+    cpu_count = available_cpu_count()
+    # Parsing and (de)compressing are CPU bound, so processes rather than threads.
+    # Each process handles one VPK at a time, so the pool size doubles as the
+    # budget of VPKs simultaneously hitting the file system, since heavy `open`
+    # fan-out serializes on kernel locks in APFS and NFS. The pool size is
+    # OVERPACK_MAX_WORKERS if set, min(#VPKs, available CPUs) otherwise; capped
+    # by OVERPACK_FS_CONCURRENCY if set, by 2/3 of the available CPUs if neither
+    # variable is
+    max_workers = int(
+        os.environ.get("OVERPACK_MAX_WORKERS", min(len(vpk_files), cpu_count))
+    )
+    if "OVERPACK_FS_CONCURRENCY" in os.environ:
+        max_workers = min(max_workers, int(os.environ["OVERPACK_FS_CONCURRENCY"]))
+    elif "OVERPACK_MAX_WORKERS" not in os.environ:
+        max_workers = min(max_workers, cpu_count * 2 // 3)
+    with ProcessPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = [executor.submit(f, p, out_dir) for p in vpk_files]
+        for future in as_completed(futures):
+            future.result()
@@ -8,22 +8,58 @@ Usage: `python3 scrape_mdl_files.py -o /path/to/wherever/you/want/the/scrapped/f
 # documentation? See https://docs.astral.sh/uv/guides/scripts/#declaring-script-dependencies
 
 from argparse import ArgumentParser
-from base64 import b64decode
+import asyncio
+from collections import Counter
 import json
 import os
 from pathlib import Path
-from typing import Generator
+from typing import Awaitable, Iterable, TypeVar
 
 import httpx
+import msgspec
 
 
 here = Path(__file__).parent
+T = TypeVar("T")
+# Maximum number of requests in flight at any given time
+MAX_CONCURRENCY = 16
 
 
-class GithubClient(httpx.Client):
-    """A thin wrapper around `httpx.Client` with two goodies:
+class Repository(msgspec.Struct):
+    """The fields we care about from
+    https://docs.github.com/en/rest/repos/repos?apiVersion=2022-11-28#list-repositories-for-a-user
+    """
+
+    url: str
+    default_branch: str
+
+
+class TreeEntry(msgspec.Struct):
+    """The fields we care about from
+    https://docs.github.com/en/rest/git/trees?apiVersion=2022-11-28#get-a-tree
+    """
+
+    path: str
+    type: str
+    url: str | None = None  # Absent for submodules
+
+
+class Tree(msgspec.Struct):
+    tree: list[TreeEntry]
+
+
+# Decoding straight into the structs above skips building a dictionary for every
+# object in the response, most notably for the (large) recursive trees
+repositories_decoder = msgspec.json.Decoder(list[Repository])
+tree_decoder = msgspec.json.Decoder(Tree)
+
+
+class GithubClient(httpx.AsyncClient):
+    """A thin wrapper around `httpx.AsyncClient` with three goodies:
     1. It injects the host and/or scheme to the URL if the user does not provide it.
     2. It injects the authentication token to every request header.
+    3. It multiplexes requests over a pool of HTTP/2 connections, so that we do
+    not pay the TCP and TLS handshakes for every single request.
     """
 
     scheme: str = "https"
@@ -31,6 +67,15 @@ class GithubClient(httpx.Client):
 
     def __init__(self, token: str, *args, **kwargs):
         self.token = token
+        kwargs.setdefault("http2", True)
+        kwargs.setdefault(
+            "limits",
+            httpx.Limits(
+                max_connections=MAX_CONCURRENCY,
+                max_keepalive_connections=MAX_CONCURRENCY,
+            ),
+        )
+        kwargs.setdefault("timeout", 30.0)
         super().__init__(*args, **kwargs)
 
     @property
@@ -39,9 +84,10 @@ class GithubClient(httpx.Client):
             "Authorization": f"Bearer {self.token}",
         }
 
-    def request(self, method, url, *args, **kwargs):
+    def build_request(self, method, url, *args, **kwargs):
+        # Overriding `build_request` rather than `request` covers `stream` too
         # Insert "Authorization" header
-        headers = kwargs.pop("headers") or {}
+        headers = kwargs.pop("headers", None) or {}
         headers |= self.auth_header
         kwargs["headers"] = headers
         # Allow the user to only provide the URL path
@@ -55,34 +101,46 @@ class GithubClient(httpx.Client):
             host=provided_url.host or self.host,
             path=provided_url.path,
         )
-        return super().request(method, clean_url, **kwargs)
+        return super().build_request(method, clean_url, *args, **kwargs)
 
 
-def user_repos(user: str, github_client: GithubClient) -> Generator[dict, None, None]:
-    """Yields repository metadata from
-    https://docs.github.com/en/rest/repos/repos?apiVersion=2022-11-28#list-repositories-for-a-user
-    """
-    yield from github_client.get(f"/users/{user}/repos").json()
+async def gather_bounded(aws: Iterable[Awaitable[T]], limit: int) -> list[T]:
+    """Same as `asyncio.gather`, but running at most `limit` awaitables at once"""
+    semaphore = asyncio.Semaphore(limit)
 
+    async def bounded(aw: Awaitable[T]) -> T:
+        async with semaphore:
+            return await aw
 
-def repo_latest_commit(url: str, github_client: GithubClient) -> dict:
-    """Fetch the last commit of a repo via
-    https://docs.github.com/en/rest/commits/commits?apiVersion=2022-11-28"""
-    return github_client.get(f"{url}/commits", params={"per_page": 1}).json()[0]
+    return await asyncio.gather(*map(bounded, aws))
 
 
-def repo_files(url: str, github_client: GithubClient) -> Generator[dict, None, None]:
-    """ "Iterates over all files in a GitHub repository.
+async def user_repos(user: str, github_client: GithubClient) -> list[Repository]:
+    """Repository metadata from
+    https://docs.github.com/en/rest/repos/repos?apiVersion=2022-11-28#list-repositories-for-a-user
+    """
+    response = await github_client.get(f"/users/{user}/repos")
+    return repositories_decoder.decode(response.content)
+
+
+async def repo_files(
+    repo_metadata: Repository, github_client: GithubClient
+) -> list[TreeEntry]:
+    """All files in a GitHub repository, as described by `repo_metadata` (an item
+    from `user_repos`).
 
     Only way to iterate through all files in a GitHub repo is to iterate the
-    Git tree, for which we need a commit's SHA256. Here we just choose the
-    latest repo commit.
+    Git tree, which
+    https://docs.github.com/en/rest/git/trees?apiVersion=2022-11-28#get-a-tree
+    accepts a branch name for. Here we just choose the tip of the default branch,
+    which the repository metadata already tells us, sparing a request to look up
+    its latest commit.
     """
-    commit_sha = repo_latest_commit(url, github_client)["sha"]
-    response = github_client.get(
-        f"{url}/git/trees/{commit_sha}", params={"recursive": True}
+    url, branch = repo_metadata.url, repo_metadata.default_branch
+    response = await github_client.get(
+        f"{url}/git/trees/{branch}", params={"recursive": True}
     )
-    yield from response.json()["tree"]
+    return tree_decoder.decode(response.content).tree
 
 
 def cli() -> Path:
@@ -98,44 +156,91 @@ def cli() -> Path:
         if arguments.out_dir is None
         else Path(arguments.out_dir).resolve()
     )
-    out_dir.mkdir(exist_ok=True)
+    out_dir.mkdir(parents=True, exist_ok=True)
     assert out_dir.is_dir()
     return out_dir
 
 
-def download_vpk_file(metadata: dict, github_client: GithubClient, out_dir: Path):
-    path, url = metadata["path"], metadata["url"]
-    vpk_path = out_dir / Path(path).name
-    assert path.endswith(".vpk")
-    content_response = github_client.get(url)
-    vpk_content = b64decode(content_response.json()["content"])
-    vpk_path.write_bytes(vpk_content)
+def vpk_out_paths(vpk_blobs: list[tuple[TreeEntry, str]], out_dir: Path) -> list[Path]:
+    """Where in `out_dir` to write each of `vpk_blobs`, pairs of tree entry and
+    repository URL. Files are named after the blob, prefixed by the repository
+    name when several blobs share a name, so that no two (concurrent) downloads
+    write to the same file.
+    """
+    names = [Path(metadata.path).name for metadata, _ in vpk_blobs]
+    counts = Counter(names)
+    out_paths = [
+        out_dir
+        / (name if counts[name] == 1 else f"{repo_url.rsplit('/', 1)[-1]}-{name}")
+        for name, (_, repo_url) in zip(names, vpk_blobs)
+    ]
+    duplicates = [p for p, count in Counter(out_paths).items() if count > 1]
+    if duplicates:
+        raise ValueError(f"Several .vpk files would be written to {duplicates!r}")
+    return out_paths
+
+
+async def download_vpk_file(
+    metadata: TreeEntry, github_client: GithubClient, vpk_path: Path
+) -> Path:
+    """Stream the blob described by tree entry `metadata` straight to `vpk_path`.
+    Asking for the raw media type spares us holding (and base64 decoding) the
+    whole file in memory, as we would with the default JSON response.
+    """
+    path, url = metadata.path, metadata.url
+    assert path.endswith(".vpk") and (url is not None)
+    async with github_client.stream(
+        "GET", url, headers={"Accept": "application/vnd.github.raw+json"}
+    ) as response:
+        response.raise_for_status()
+        with vpk_path.open("wb") as f:
+            async for chunk in response.aiter_bytes(chunk_size=1 << 16):
+                f.write(chunk)
     print(f"Wrote {vpk_path}")
     return vpk_path
 
 
-def main(out_dir: Path):
+async def main_async(out_dir: Path):
     """Iterate over all repositories and files under GitHub user `veeva`, and save
-    to `out_dir` those with extension `.mdl`.
+    to `out_dir` those with extension `.vpk`. Requests are issued concurrently,
+    `MAX_CONCURRENCY` at a time.
     """
     (out_dir / "README.md").write_text(
         f"Content scrapped with `{Path(__file__).relative_to(here.parent)}`"
     )
-    outdir_to_url = {}
-    github_client = GithubClient(os.environ["GITHUB_TOKEN"])
-    for repo_metadata in user_repos("veeva", github_client):
-        repo_url = repo_metadata["url"]
-        for blob_metadata in repo_files(repo_url, github_client):
-            path = blob_metadata["path"]
-            if not path.endswith(".vpk"):
-                continue
-            out_path = download_vpk_file(blob_metadata, github_client, out_dir)
-            outdir_to_url[str(out_path)] = repo_url
+    async with GithubClient(os.environ["GITHUB_TOKEN"]) as github_client:
+        repos = await user_repos("veeva", github_client)
+        repo_urls = [r.url for r in repos]
+        trees = await gather_bounded(
+            (repo_files(r, github_client) for r in repos), MAX_CONCURRENCY
+        )
+        vpk_blobs = [
+            (blob_metadata, repo_url)
+            for repo_url, tree in zip(repo_urls, trees)
+            for blob_metadata in tree
+            if (blob_metadata.type == "blob") and blob_metadata.path.endswith(".vpk")
+        ]
+        out_paths = await gather_bounded(
+            (
+                download_vpk_file(blob_metadata, github_client, vpk_path)
+                for (blob_metadata, _), vpk_path in zip(
+                    vpk_blobs, vpk_out_paths(vpk_blobs, out_dir)
+                )
+            ),
+            MAX_CONCURRENCY,
+        )
+    outdir_to_url = {
+        str(out_path): repo_url for out_path, (_, repo_url) in zip(out_paths, vpk_blobs)
+    }
 
     sources_path = out_dir / "source_urls.json"
     sources_path.write_text(json.dumps(outdir_to_url, indent=4))
     print(f"Wrote {sources_path}")
 
 
+def main(out_dir: Path):
+    asyncio.run(main_async(out_dir))
+
+
 if __name__ == "__main__":
     main(cli())
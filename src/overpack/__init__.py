@@ -1,25 +1,153 @@
 from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from copy import copy
 import csv
 from dataclasses import dataclass
+from enum import Enum, auto
 import json
-from collections import deque
-from functools import cached_property
+from functools import cache, cached_property
 from hashlib import md5
-from io import StringIO
+from io import BytesIO, TextIOWrapper
+from itertools import chain, repeat
+import os
 from pathlib import Path
-from tempfile import TemporaryDirectory
-from typing import Literal, TypeAlias, TypeVar
+import stat
+import threading
+import time
+from typing import Callable, Collection, Iterable, Iterator, Literal, TypeAlias, TypeVar
 import xml.etree.ElementTree as ET
-from zipfile import Path as ZipPath, ZipFile, is_zipfile
+from xml.sax.saxutils import escape
+from zipfile import (
+    Path as ZipPath,
+    ZIP_DEFLATED,
+    ZIP_STORED,
+    ZipFile,
+    ZipInfo,
+    is_zipfile,
+)
 
-import dict2xml
 from meddle import Command
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None  # type: ignore[assignment]
+    pa_csv = None  # type: ignore[assignment]
+
+try:
+    from lxml import etree as lxml_etree  # pyright: ignore[reportAttributeAccessIssue]
+except ImportError:
+    lxml_etree = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
 
 ZipPathPlus: TypeAlias = Path | ZipPath
 P = TypeVar("P", Path, ZipPath, ZipPathPlus)
+T = TypeVar("T")
 
 Record: TypeAlias = dict[str, str]  # TODO: maybe support more data types?
+# Path of a file within the VPK, relative to its root, and the file's contents
+Entry: TypeAlias = tuple[str, bytes]
+
+
+def available_cpu_count() -> int:
+    """Number of CPUs the current process is allowed to run on, which can be less
+    than `os.cpu_count()`, e.g., in containers pinned to a CPU set or under
+    `taskset`. Falls back to `os.cpu_count()` where the affinity mask cannot be
+    queried (MacOS and Windows).
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+_MAX_WORKERS = min(32, available_cpu_count() * 4)
+# Below this many paths per batch, the cost of re-opening a zipped VPK in each
+# worker outweighs loading the paths in parallel
+_MIN_BATCH_SIZE = 16
+
+
+@cache
+def _executor() -> ThreadPoolExecutor:
+    """The thread pool shared by all `Vpk.load` calls, created on first use"""
+    return ThreadPoolExecutor(max_workers=_MAX_WORKERS)
+
+
+_open_zip_files = threading.local()
+
+
+@contextmanager
+def _open_zip(path: str | Path) -> Iterator[ZipFile]:
+    """Open the zip file at `path` for reading. If an enclosing `_open_zip` in
+    the same thread already opened it, its handle is reused instead, and only
+    the outermost `_open_zip` closes it. `zipfile.ZipFile` is not safe to share
+    across threads, hence the bookkeeping being per thread.
+    """
+    key = os.fspath(path)
+    zip_files: dict[str, ZipFile] = _open_zip_files.__dict__.setdefault("open", {})
+    if key in zip_files:
+        yield zip_files[key]
+        return
+    with ZipFile(key) as zip_file:
+        zip_files[key] = zip_file
+        try:
+            yield zip_file
+        finally:
+            del zip_files[key]
+
+
+def _load_batch(load: Callable[[ZipPathPlus], T], paths: list[ZipPathPlus]) -> list[T]:
+    """Apply `load` to every path in `paths`, re-rooting paths inside a zipped VPK
+    onto the current thread's handle of the archive.
+    """
+    first = paths[0] if paths else None
+    if not isinstance(first, ZipPath) or (first.root.filename is None):
+        return [load(p) for p in paths]
+    with _open_zip(first.root.filename) as zip_file:
+        return [load(ZipPath(zip_file, p.at)) for p in paths]  # type: ignore[union-attr]
+
+
+def _load_in_parallel(
+    load: Callable[[ZipPathPlus], T], paths: list[ZipPathPlus]
+) -> list[T]:
+    """Apply `load` to every path in `paths` in batches over `_executor`, keeping
+    the order of `paths` in the output. Loads inline when there are too few
+    paths to be worth it.
+    """
+    n_batches = min(_MAX_WORKERS, len(paths) // _MIN_BATCH_SIZE)
+    if n_batches <= 1:
+        return [load(p) for p in paths]
+    size = -(-len(paths) // n_batches)
+    batches = [paths[i : i + size] for i in range(0, len(paths), size)]
+    # The calling thread takes on the first batch itself, on the handle it
+    # already has open, while the pool works through the rest
+    futures = [_executor().submit(_load_batch, load, b) for b in batches[1:]]
+    loaded = _load_batch(load, batches[0])
+    for future in futures:
+        loaded.extend(future.result())
+    return loaded
+
+
+def json_loads(raw: bytes) -> dict:
+    """Same as `json.loads`, through `orjson` if it is installed"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def json_dumps(obj: dict) -> bytes:
+    """Serialize `obj` compactly, as Vault does with workflow files, through
+    `orjson` if it is installed. Either way the output is the same.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
 
 
 def md5_hash(s: str | bytes) -> str:
@@ -29,11 +157,33 @@ def md5_hash(s: str | bytes) -> str:
     return md5(s.encode() if isinstance(s, str) else s).hexdigest()
 
 
+def lower_suffix(path: ZipPathPlus | str) -> str:
+    """Same as `path.suffix.lower()`, but reading the extension straight off the
+    archive member name for `zipfile.Path`, whose `suffix` and `name` properties
+    build a throwaway `pathlib.Path` on every access. Member names as strings,
+    e.g. from `ZipFile.namelist`, are accepted too.
+    """
+    if isinstance(path, ZipPath):
+        name = path.at.rstrip("/").rpartition("/")[2]
+    elif isinstance(path, str):
+        name = path.rstrip("/").rpartition("/")[2]
+    else:
+        name = path.name
+    return os.path.splitext(name)[1].lower()
+
+
 def first_child_with_suffix(path: P, suffix: str) -> P | None:
     """Return the first file path under `path` with extension `suffix`, by
-    iterating with `iterdir`. Returns `None` if none could be found.
+    iterating with `iterdir` (`os.scandir` for folders). Returns `None` if none
+    could be found.
     """
-    return next((p for p in path.iterdir() if p.suffix.lower() == suffix), None)
+    if isinstance(path, Path):
+        with os.scandir(path) as entries:
+            return next(
+                (path / e.name for e in entries if lower_suffix(e.name) == suffix),
+                None,
+            )
+    return next((p for p in path.iterdir() if lower_suffix(p) == suffix), None)
 
 
 def has_child_with_suffix(path: ZipPathPlus, suffix: str) -> bool:
@@ -41,53 +191,179 @@ def has_child_with_suffix(path: ZipPathPlus, suffix: str) -> bool:
     return first_child_with_suffix(path, suffix) is not None
 
 
+def index_children(path: P) -> dict[str, P]:
+    """Map each (lowercased) file extension under `path` to the first file path
+    with said extension, listing `path` only once. Saves us from
+    re-listing the same folder for every extension we are interested in, which
+    for `zipfile.Path` means re-scanning the whole archive's name list.
+    """
+    children: dict[str, P] = {}
+    if isinstance(path, Path):
+        # `os.scandir` hands out bare names, so we only build paths for the
+        # children that make it into the index
+        with os.scandir(path) as entries:
+            for e in entries:
+                if (suffix := lower_suffix(e.name)) not in children:
+                    children[suffix] = path / e.name
+        return children
+    for p in path.iterdir():
+        children.setdefault(lower_suffix(p), p)
+    return children
+
+
+def index_zip_components(zip_file: ZipFile) -> dict[str, dict[str, str]]:
+    """Same as `index_children` for every folder under "components/" in the zipped
+    VPK `zip_file`, keyed by folder, but out of a single scan over the archive's
+    name list and holding member names instead of `zipfile.Path`'s.
+    """
+    components: dict[str, dict[str, str]] = {}
+    for name in zip_file.namelist():
+        parts = name.split("/", 3)
+        # Files right under "components/", e.g., `.DS_Store`, are not components
+        if (len(parts) < 3) or (parts[0] != "components"):
+            continue
+        children = components.setdefault(f"components/{parts[1]}/", {})
+        if not parts[2]:  # The component folder itself
+            continue
+        child = f"components/{parts[1]}/{parts[2]}" + ("/" if len(parts) > 3 else "")
+        children.setdefault(lower_suffix(child), child)
+    return components
+
+
+class ComponentKind(Enum):
+    DATA = auto()
+    CONFIGURATION = auto()
+    UNKNOWN = auto()
+
+
+def classify(children: Collection[str]) -> ComponentKind:
+    """Tells the kind of a component folder given its `index_children` index, or
+    any other collection of the (lowercased) file extensions in it
+    """
+    if (".csv" in children) and (".xml" in children):
+        return ComponentKind.DATA
+    if ((".mdl" in children) or (".json" in children)) and (".md5" in children):
+        return ComponentKind.CONFIGURATION
+    return ComponentKind.UNKNOWN
+
+
 def is_data_component(path: ZipPathPlus) -> bool:
-    """Checks whether `path`"""
-    return has_child_with_suffix(path, ".csv") and has_child_with_suffix(path, ".xml")
+    """Checks whether `path` is a data component folder"""
+    return classify(index_children(path)) is ComponentKind.DATA
 
 
 def is_configuration_component(path: ZipPathPlus) -> bool:
-    return (
-        has_child_with_suffix(path, ".mdl") or has_child_with_suffix(path, ".json")
-    ) and has_child_with_suffix(path, ".md5")
+    """Checks whether `path` is a configuration component folder"""
+    return classify(index_children(path)) is ComponentKind.CONFIGURATION
+
+
+def java_paths(path: ZipPathPlus) -> list[ZipPathPlus]:
+    """All '.java' files under `path`, skipping the `__MACOSX` folders people
+    leave behind when editing VPK's in MacOS.
+    """
+    if isinstance(path, ZipPath):
+        # The archive's name list already holds every path within, so a single
+        # scan over it beats walking the tree with `zipfile.Path.iterdir`
+        zip_file = path.root
+        return [
+            ZipPath(zip_file, name)
+            for name in zip_file.namelist()
+            if name.endswith(".java") and ("__MACOSX" not in name.split("/"))
+        ]
+    # `os.walk` lists each folder with `os.scandir` and tells folders apart from
+    # files without a `stat` call per entry, unlike `pathlib.Path.iterdir`
+    paths: list[ZipPathPlus] = []
+    for root, dir_names, file_names in os.walk(path):
+        # Pruning in place keeps `os.walk` from descending into them. Ought to
+        # be unnecessary but people edit VPK's in MacOS, leaving unspec'd stuff
+        # behind
+        dir_names[:] = [d for d in dir_names if d != "__MACOSX"]
+        paths.extend(Path(root, f) for f in file_names if f.endswith(".java"))
+    return paths
+
+
+def write_entries(path: Path, entries: Iterable[Entry]) -> list[Path]:
+    """Write `entries` under `path`, the VPK root *before zipping*. E.g.
+    /path/to/package, which will eventually result in /path/to/package.vpk.
+    Returns the paths of the written files, in the same order as `entries`.
+    """
+    target_paths = []
+    # Entries tend to share folders, e.g., all files of a component, which
+    # need only be created once
+    made_dirs: set[Path] = set()
+    for arcname, content in entries:
+        target_path = path / arcname
+        if target_path.parent not in made_dirs:
+            target_path.parent.mkdir(parents=True, exist_ok=True)
+            made_dirs.add(target_path.parent)
+        target_path.write_bytes(content)
+        target_paths.append(target_path)
+    return target_paths
+
+
+# Buffer for the VPK files we write. `ZipFile` issues a handful of small writes
+# per entry (local header, data, descriptor), which this batches into few calls
+_WRITE_BUFFER_SIZE = 1 << 20
+
+# Entries smaller than this are stored as they are, since deflating them saves
+# next to nothing while still costing a zlib stream each
+_MIN_DEFLATE_SIZE = 128
+
+
+def _write_entry(zip_file: ZipFile, arcname: str, content: bytes) -> None:
+    """Add `content` to `zip_file` as `arcname`, deflated at the fastest level
+    (text files such as CSV and XML still shrink severalfold) unless it is tiny.
+    """
+    info = ZipInfo(arcname, date_time=time.localtime()[:6])
+    # A regular file readable by everyone once extracted, as those added with
+    # `ZipFile.write` were, rather than the owner-only default of `writestr`
+    info.external_attr = (stat.S_IFREG | 0o644) << 16
+    if len(content) < _MIN_DEFLATE_SIZE:
+        zip_file.writestr(info, content, compress_type=ZIP_STORED)
+    else:
+        zip_file.writestr(info, content, compress_type=ZIP_DEFLATED, compresslevel=1)
 
 
 @dataclass
 class JavaSdkCode:
     path: Path
-    content: str
+    content: bytes
+
+    @cached_property
+    def text(self) -> str:
+        """`content` decoded, only done if and when asked for"""
+        return self.content.decode()
 
     @classmethod
     def load(cls, path: ZipPathPlus) -> JavaSdkCode:
         """`path` to the actual '.java' file."""
-        # `pathlib.Path.parents` and `pathlib.Path.relative_to` are not implemented
-        # for `zipfile.Path`, which is why we need this wrap
-        wrapped_path = Path(str(path))
-        javasdk_dir = next(
-            (p for p in wrapped_path.parents if p.name == "javasdk"), None
-        )
-        if javasdk_dir is None:
+        # A single split of the path string, at the innermost 'javasdk' folder,
+        # instead of walking up `pathlib.Path.parents` (which `zipfile.Path` does
+        # not implement anyway)
+        name = path.at if isinstance(path, ZipPath) else path.as_posix()
+        _, javasdk_dir, relative_path = f"/{name}".rpartition("/javasdk/")
+        if not javasdk_dir:
             raise ValueError(
                 f"By convention, Java SDK code files ought to go under a 'javasdk' folder. Instead got {repr(str(path))}"
             )
-        # Very importantly, notice below is `path.read_text()` and not
-        # `wrapped_path.read_text()`. That's because `path` needs to be `zipfile.Path`
-        # when reading from a zipped VPK and `pathlib.Path` when reading for a folder,
-        # which upstream (i.e., `VPK.load`) handles correctly. Otherwise, the user
-        # will have to. We could be extra cautious and do some validation in here,
-        # e.g., `is_zipfile(javasdk_dir.parent)` or `javasdk_dir.parent.is_dir()`
+        # Very importantly, notice below is `path.read_bytes()` and not
+        # `Path(str(path)).read_bytes()`. That's because `path` needs to be
+        # `zipfile.Path` when reading from a zipped VPK and `pathlib.Path` when
+        # reading for a folder, which upstream (i.e., `VPK.load`) handles
+        # correctly. Otherwise, the user will have to. We could be extra cautious
+        # and do some validation in here, e.g., `is_zipfile` on the VPK root
         try:
-            content = path.read_text()
+            content = path.read_bytes()
         except NotADirectoryError as e:
             raise TypeError(
-                "It seems as though you are trying to read a Java file from inside a .zip file using, `pathlib.Path.read_text` instead of `zipfile.Path.read_text`"
+                "It seems as though you are trying to read a Java file from inside a .zip file using, `pathlib.Path.read_bytes` instead of `zipfile.Path.read_bytes`"
             ) from e
-        return cls(path=wrapped_path.relative_to(javasdk_dir.parent), content=content)
+        return cls(path=Path("javasdk", relative_path), content=content)
 
     def __repr__(self):
         return f"{self.__class__.__name__}(path={str(self.path)})"
 
-    def dumps(self):
+    def dumps(self) -> bytes:
         return self.content
 
     def dump(self, path: Path) -> Path:
@@ -96,16 +372,39 @@ class JavaSdkCode:
         """
         target_path = path / self.path
         target_path.parent.mkdir(parents=True, exist_ok=True)
-        target_path.write_text(self.dumps())
+        target_path.write_bytes(self.dumps())
         return target_path
 
 
-@dataclass
+@dataclass(slots=True)
 class Component:
     number: str
 
     @classmethod
-    def load(cls, path: ZipPathPlus) -> Component:
+    def load(
+        cls, path: ZipPathPlus, children: dict[str, ZipPathPlus] | None = None
+    ) -> Component:
+        raise NotImplementedError
+
+    def entries(self) -> list[Entry]:
+        """The files making up the component, paths relative to the VPK root"""
+        raise NotImplementedError
+
+    def regenerate(
+        self,
+        *,
+        object_name: str,
+        data_type: Literal["Object"],
+        action: Literal["Create", "Upsert"],
+        id_param: str | None = None,
+        step_required: bool = False,
+        record_migration_mode: bool = False,
+    ) -> None:
+        """Regenerate, in place, the file(s) derived from the component's contents.
+        Arguments are those of `DataComponent.generate_manifest`, and components
+        that do not need them ignore them, so that the same ones can be passed to
+        every component regardless of its kind.
+        """
         raise NotImplementedError
 
     def dump(self, path: Path) -> tuple[Path | None, ...]:
@@ -115,31 +414,119 @@ class Component:
         return f"{self.__class__.__name__}(number={repr(self.number)})"
 
 
+def _arrow_columns(raw: bytes, header: list[str]) -> dict[str, list[str]] | None:
+    """Parse CSV `raw` column-wise with PyArrow's C++ reader, keeping every value
+    as a string. Returns `None` when the contents are too irregular for PyArrow
+    (e.g., rows of differing length), for the caller to fall back to `csv`.
+    """
+    assert (pa is not None) and (pa_csv is not None)
+    try:
+        table = pa_csv.read_csv(
+            pa.BufferReader(raw),
+            read_options=pa_csv.ReadOptions(use_threads=False),
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={name: pa.string() for name in header},
+                strings_can_be_null=False,
+                quoted_strings_can_be_null=False,
+            ),
+        )
+    except pa.ArrowInvalid:
+        return None
+    if table.column_names != header:
+        return None
+    return dict(zip(header, (column.to_pylist() for column in table.columns)))
+
+
 @dataclass
 class Data:
-    raw: str
+    raw: bytes
+
+    def __setattr__(self, name: str, value: object) -> None:
+        super().__setattr__(name, value)
+        if name == "raw":
+            # Everything cached is derived from `raw`, hence stale once it changes
+            for cached in ("columns", "records", "record_count", "checksum"):
+                self.__dict__.pop(cached, None)
+
+    @cached_property
+    def columns(self) -> dict[str, list[str]]:
+        """The CSV contents laid out column-wise, i.e., one list of values per
+        column name. Much lighter than a dictionary per row. Same as
+        `csv.DictReader`, blank rows are skipped; short rows are padded with
+        empty strings and values in excess of the header are dropped.
+        """
+        # Decoded as the reader goes, so only the header is if PyArrow takes over
+        reader = csv.reader(TextIOWrapper(BytesIO(self.raw), newline=""))
+        header = next(reader, [])
+        if (pa is not None) and header:
+            arrow_columns = _arrow_columns(self.raw, header)
+            if arrow_columns is not None:
+                return arrow_columns
+        columns: list[list[str]] = [[] for _ in header]
+        for row in reader:
+            if not row:
+                continue
+            for column, value in zip(columns, chain(row, repeat(""))):
+                column.append(value)
+        return dict(zip(header, columns))
+
+    def iter_records(self) -> Iterator[Record]:
+        """Like `records`, but builds each record only as it is consumed"""
+        for row in zip(*self.columns.values()):
+            yield dict(zip(self.columns, row))
 
     @cached_property
     def records(self) -> list[Record]:
-        return list(csv.DictReader(StringIO(self.raw)))
+        return list(self.iter_records())
+
+    @cached_property
+    def record_count(self) -> int:
+        """Same as `len(self.records)`, without building the records. When no
+        value is quoted, none can span several lines, so records are counted
+        off the (non-blank) lines themselves instead of parsing the CSV.
+        """
+        if (b'"' in self.raw) or (self.raw[:1] in (b"\n", b"\r")):
+            return len(next(iter(self.columns.values()), []))
+        return max(sum(1 for line in self.raw.splitlines() if line) - 1, 0)
+
+    def column(self, name: str) -> list[str]:
+        """The values of column `name`, in record order"""
+        if name not in self.columns:
+            raise ValueError(f"No column named {name!r}")
+        return self.columns[name]
 
     @cached_property
     def checksum(self) -> str:
         return md5_hash(self.raw)
 
-    def dumps(self) -> str:
+    def dumps(self) -> bytes:
         return self.raw
 
 
+# Manifests are small and trusted to the extent of the VPK itself, so there is
+# no need to track IDs or resolve entities while parsing them
+_XML_PARSER = (
+    None
+    if lxml_etree is None
+    else lxml_etree.XMLParser(collect_ids=False, resolve_entities=False)
+)
+
+
 @dataclass
 class Manifest:
-    raw: str
+    raw: bytes
 
     @cached_property
     def parsed(self) -> ET.Element:
-        return ET.Element(self.raw)
+        """The parsed manifest, through `lxml` if it is installed (about twice as
+        fast), whose elements share the `xml.etree.ElementTree` API.
+        """
+        if lxml_etree is not None:
+            return lxml_etree.fromstring(self.raw, parser=_XML_PARSER)
+        return ET.fromstring(self.raw)
 
-    def dumps(self) -> str:
+    def dumps(self) -> bytes:
         return self.raw
 
     def dump(self, path: Path) -> Path:
@@ -147,11 +534,29 @@ class Manifest:
         /path/to/package, which will eventually result in /path/to/package.vpk
         """
         target_path = path / "vaultpackage.xml"
-        target_path.write_text(self.dumps())
+        target_path.write_bytes(self.dumps())
         return target_path
 
 
-@dataclass
+# The layout `dict2xml` used to give data component manifests: tags sorted
+# alphabetically, two-space indents and `None` values as self-closing tags
+MANIFEST_TEMPLATE = """\
+<stepheader>
+  <checksum>{checksum}</checksum>
+  <datastepheader>
+    <action>{action}</action>
+    <datatype>{data_type}</datatype>
+    {id_param}
+    <object>{object_name}</object>
+    <recordcount>{record_count}</recordcount>
+    <recordmigrationmode>{record_migration_mode}</recordmigrationmode>
+  </datastepheader>
+  <label>{label}</label>
+  <steprequired>{step_required}</steprequired>
+</stepheader>"""
+
+
+@dataclass(slots=True)
 class DataComponent(Component):
     label: str
     data: Data
@@ -174,37 +579,59 @@ class DataComponent(Component):
             raise ValueError(
                 "If argument 'action' is 'Upsert', then 'id_param' ought to be provided too."
             )
-        if action == "Upsert" and not all(
-            id_param in r.keys() for r in self.data.records
-        ):
+        if action == "Upsert" and id_param not in self.data.columns:
             raise ValueError(
-                f"If argument 'action' is 'Upsert', then 'id_param' ought to be a column in the corresponding data. Instead got columns: {', '.join(map(repr, self.data.records[0].keys()))}"
+                f"If argument 'action' is 'Upsert', then 'id_param' ought to be a column in the corresponding data. Instead got columns: {', '.join(map(repr, self.data.columns))}"
             )
-        d = {
-            "stepheader": {
-                "label": self.label,
-                "steprequired": step_required,
-                "checksum": self.data.checksum,
-                "datastepheader": {
-                    "object": object_name,
-                    "idparam": id_param,
-                    "datatype": data_type,
-                    "action": action,
-                    "recordmigrationmode": record_migration_mode,
-                    "recordcount": len(self.data.records),
-                },
-            }
-        }
-        s = dict2xml.Converter("").build(d, closed_tags_for=[None])
-        return Manifest(s)
+        s = MANIFEST_TEMPLATE.format(
+            checksum=self.data.checksum,
+            action=escape(action),
+            data_type=escape(data_type),
+            id_param=(
+                "<idparam/>"
+                if id_param is None
+                else f"<idparam>{escape(id_param)}</idparam>"
+            ),
+            object_name=escape(object_name),
+            record_count=self.data.record_count,
+            record_migration_mode=record_migration_mode,
+            label=escape(self.label),
+            step_required=step_required,
+        )
+        return Manifest(s.encode())
+
+    def regenerate(
+        self,
+        *,
+        object_name: str,
+        data_type: Literal["Object"],
+        action: Literal["Create", "Upsert"],
+        id_param: str | None = None,
+        step_required: bool = False,
+        record_migration_mode: bool = False,
+    ) -> None:
+        """Replace the manifest with one generated via `generate_manifest`"""
+        self.manifest = self.generate_manifest(
+            object_name=object_name,
+            data_type=data_type,
+            action=action,
+            id_param=id_param,
+            step_required=step_required,
+            record_migration_mode=record_migration_mode,
+        )
 
     @classmethod
-    def load(cls, path: ZipPathPlus) -> DataComponent:
-        """`path` to component folder"""
-        csv_path = first_child_with_suffix(path, ".csv")
+    def load(
+        cls, path: ZipPathPlus, children: dict[str, ZipPathPlus] | None = None
+    ) -> DataComponent:
+        """`path` to component folder. `children` is its `index_children` index,
+        which is computed if not provided.
+        """
+        children = index_children(path) if children is None else children
+        csv_path = children.get(".csv")
         if csv_path is None:
             raise ValueError(f"Expected a .csv file in data component {str(path)}.")
-        xml_path = first_child_with_suffix(path, ".xml")
+        xml_path = children.get(".xml")
         if xml_path is None:
             raise ValueError(f"Expected a .xml file in data component {str(path)}.")
         if csv_path.stem != xml_path.stem:
@@ -218,26 +645,29 @@ class DataComponent(Component):
         return cls(
             number=path.stem,
             label=csv_path.stem,
-            data=Data(csv_path.read_text()),
-            manifest=Manifest(xml_path.read_text()),
+            data=Data(csv_path.read_bytes()),
+            manifest=Manifest(xml_path.read_bytes()),
         )
 
-    def dump(self, path: Path) -> tuple[Path, Path]:
-        """`path` is the one to the VPK root, *before zipping*. E.g.
-        /path/to/package, which will eventually result in /path/to/package.vpk
-        """
+    def entries(self) -> list[Entry]:
+        """The .csv and .xml files, in that order, paths relative to the VPK root"""
         if self.manifest is None:
             # With a better understanding of the contents and structure of a data
             # components manifest file, perhaps this could be generated generally
             raise ValueError(
                 "Cannot serialize a data component without a manifest. Generate one first, e.g., via 'DataComponent.generate_manifest'."
             )
-        subdir = path / "components" / self.number
-        subdir.mkdir(parents=True, exist_ok=True)
-        csv_path = subdir / f"{self.label}.csv"
-        xml_path = subdir / f"{self.label}.xml"
-        csv_path.write_text(self.data.dumps())
-        xml_path.write_text(self.manifest.dumps())
+        stem = f"components/{self.number}/{self.label}"
+        return [
+            (f"{stem}.csv", self.data.dumps()),
+            (f"{stem}.xml", self.manifest.dumps()),
+        ]
+
+    def dump(self, path: Path) -> tuple[Path, Path]:
+        """`path` is the one to the VPK root, *before zipping*. E.g.
+        /path/to/package, which will eventually result in /path/to/package.vpk
+        """
+        csv_path, xml_path = write_entries(path, self.entries())
         return csv_path, xml_path
 
 
@@ -249,25 +679,37 @@ class Md5:
     @classmethod
     def load(cls, path: ZipPathPlus) -> Md5:
         """`path` to the actual .md5 file"""
-        return cls(*path.read_text().split())
+        # Only the (small) fields get decoded, not the whole file
+        return cls(*(field.decode() for field in path.read_bytes().split()))
 
-    def dumps(self) -> str:
-        return f"{self.hash} {self.component_info}"
+    def dumps(self) -> bytes:
+        return f"{self.hash} {self.component_info}".encode()
 
 
 @dataclass
 class Mdl:
-    raw: str
+    raw: bytes
+
+    def __setattr__(self, name: str, value: object) -> None:
+        super().__setattr__(name, value)
+        if name == "raw":
+            # Everything cached is derived from `raw`, hence stale once it changes
+            for cached in ("command", "checksum"):
+                self.__dict__.pop(cached, None)
 
     @cached_property
     def command(self) -> Command:
-        return Command.loads(self.raw)
+        return Command.loads(self.raw.decode())
 
-    def dumps(self) -> str:
+    @cached_property
+    def checksum(self) -> str:
+        return md5_hash(self.raw)
+
+    def dumps(self) -> bytes:
         return self.raw
 
 
-@dataclass
+@dataclass(slots=True)
 class ConfigurationComponent(Component):
     component_type_name: str
     component_name: str
@@ -316,23 +758,43 @@ class ConfigurationComponent(Component):
     def generate_md5(self) -> Md5:
         component_info = ".".join([self.component_type_name, self.component_name])
         if self.mdl is not None:
-            return Md5(hash=md5_hash(self.mdl.raw), component_info=component_info)
+            return Md5(hash=self.mdl.checksum, component_info=component_info)
         elif self.workflow is not None:
             return Md5(hash=self.workflow["checksum"], component_info=component_info)
         raise ValueError(
             f"Could not generate a 'Md5' object for {repr(self.number)} since it contains neither a .mdl file nor a .json file"
         )
 
+    def regenerate(
+        self,
+        *,
+        object_name: str,
+        data_type: Literal["Object"],
+        action: Literal["Create", "Upsert"],
+        id_param: str | None = None,
+        step_required: bool = False,
+        record_migration_mode: bool = False,
+    ) -> None:
+        """Replace the MD5 with one generated via `generate_md5`. The manifest
+        arguments are ignored.
+        """
+        self.md5 = self.generate_md5()
+
     @classmethod
-    def load(cls, path: ZipPathPlus) -> ConfigurationComponent:
-        """`path` to component folder"""
-        md5_path = first_child_with_suffix(path, ".md5")
+    def load(
+        cls, path: ZipPathPlus, children: dict[str, ZipPathPlus] | None = None
+    ) -> ConfigurationComponent:
+        """`path` to component folder. `children` is its `index_children` index,
+        which is computed if not provided.
+        """
+        children = index_children(path) if children is None else children
+        md5_path = children.get(".md5")
         if md5_path is None:
             raise ValueError(
                 f"Expected a .md5 file in configuration component {str(path)}."
             )
-        mdl_path = first_child_with_suffix(path, ".mdl")
-        json_path = first_child_with_suffix(path, ".json")
+        mdl_path = children.get(".mdl")
+        json_path = children.get(".json")
         if mdl_path is None and json_path is not None:
             component_type_name, component_name = json_path.stem.split(".", maxsplit=1)
         elif json_path is None and mdl_path is not None:
@@ -345,40 +807,59 @@ class ConfigurationComponent(Component):
             raise ValueError(
                 f"File names for .json/.mdl, and .md5 files ought to be the same. Got {repr(ci)}, and {str(md5_path)}, respectively."
             )
-        dep_path = first_child_with_suffix(path, ".dep")
+        dep_path = children.get(".dep")
         return cls(
             component_type_name=component_type_name,
             component_name=component_name,
             number=path.stem,
             md5=Md5.load(md5_path),
-            mdl=None if mdl_path is None else Mdl(mdl_path.read_text()),
-            workflow=None if json_path is None else json.loads(json_path.read_text()),
-            dep=None if dep_path is None else Data(dep_path.read_text()),
+            mdl=None if mdl_path is None else Mdl(mdl_path.read_bytes()),
+            workflow=None if json_path is None else json_loads(json_path.read_bytes()),
+            dep=None if dep_path is None else Data(dep_path.read_bytes()),
         )
 
-    def dump(self, path: Path) -> tuple[Path, Path | None, Path | None, Path | None]:
-        """`path` is the one to the VPK root, *before zipping*. E.g.
-        /path/to/package, which will eventually result in /path/to/package.vpk
+    def entries(self) -> list[Entry]:
+        """The .md5 file first, followed by whichever of the .mdl, .json and .dep
+        files the component has, paths relative to the VPK root
         """
-        stem = f"{self.component_type_name}.{self.component_name}"
-        subdir = path / "components" / self.number
-        subdir.mkdir(parents=True, exist_ok=True)
-        md5_path = subdir / f"{stem}.md5"
-        md5_path.write_text(
-            self.generate_md5().dumps() if self.md5 is None else self.md5.dumps()
+        stem = (
+            f"components/{self.number}/{self.component_type_name}.{self.component_name}"
         )
-        mdl_path, workflow_path, dep_path = None, None, None
+        entries = [
+            (
+                f"{stem}.md5",
+                self.generate_md5().dumps() if self.md5 is None else self.md5.dumps(),
+            )
+        ]
         if self.mdl is not None:
-            mdl_path = subdir / f"{stem}.mdl"
-            mdl_path.write_text(self.mdl.dumps())
+            entries.append((f"{stem}.mdl", self.mdl.dumps()))
         if self.workflow is not None:
-            workflow_path = subdir / f"{stem}.json"
-            workflow_path.write_text(json.dumps(self.workflow))
+            entries.append((f"{stem}.json", json_dumps(self.workflow)))
         if self.dep is not None:
-            dep_path = subdir / f"{stem}.dep"
-            dep_path.write_text(self.dep.dumps())
+            entries.append((f"{stem}.dep", self.dep.dumps()))
+        return entries
+
+    def dump(self, path: Path) -> tuple[Path, Path | None, Path | None, Path | None]:
+        """`path` is the one to the VPK root, *before zipping*. E.g.
+        /path/to/package, which will eventually result in /path/to/package.vpk
+        """
+        paths = {p.suffix: p for p in write_entries(path, self.entries())}
+        return paths[".md5"], paths.get(".mdl"), paths.get(".json"), paths.get(".dep")
 
-        return md5_path, mdl_path, workflow_path, dep_path
+
+def load_component(
+    path: ZipPathPlus, children: dict[str, ZipPathPlus] | None = None
+) -> DataComponent | ConfigurationComponent:
+    """Load the component under folder `path`, whichever its kind. `children` is
+    its `index_children` index, which is computed if not provided.
+    """
+    children = index_children(path) if children is None else children
+    kind = classify(children)
+    if kind is ComponentKind.DATA:
+        return DataComponent.load(path, children)
+    elif kind is ComponentKind.CONFIGURATION:
+        return ConfigurationComponent.load(path, children)
+    raise ValueError(f"{str(path)} is neither a data nor a configuration component.")
 
 
 @dataclass
@@ -391,90 +872,155 @@ class Vpk:
     def load(cls, path: Path) -> Vpk:
         """`path` to VPK package."""
         path = Path(path).resolve()
-        path_: ZipPathPlus
-        if is_zipfile(str(path)):  # Compressed
-            path_ = ZipPath(path)
+        if is_zipfile(path):  # Compressed
+            # Open the archive once and share the handle across every read below,
+            # instead of having `zipfile.Path` open and parse it on its own
+            with _open_zip(path) as zip_file:
+                return cls._load(ZipPath(zip_file))
         elif path.is_dir():  # Uncompressed
-            path_ = Path(path)
-        else:  # Something else?
-            raise ValueError(
-                f"VPK packages can only be loaded from zipped or unzipped (a folder) sources. Instead got {repr(str(path))}"
-            )
+            return cls._load(path)
+        # Something else?
+        raise ValueError(
+            f"VPK packages can only be loaded from zipped or unzipped (a folder) sources. Instead got {repr(str(path))}"
+        )
+
+    @staticmethod
+    def component_kinds(path: Path) -> dict[str, ComponentKind]:
+        """The kind of every component of the VPK package at `path`, keyed by
+        component folder name (e.g., "00010"). Only file names are looked at, so
+        this is much cheaper than `Vpk.load` when contents are not needed.
+        """
+        path = Path(path).resolve()
+        if is_zipfile(path):
+            with _open_zip(path) as zip_file:
+                index = index_zip_components(zip_file)
+            return {at.split("/")[1]: classify(c) for at, c in index.items()}
+        elif path.is_dir():
+            components_dir = path / "components"
+            if not components_dir.exists():
+                return {}
+            with os.scandir(components_dir) as entries:
+                return {
+                    entry.name: classify(index_children(Path(entry.path)))
+                    for entry in entries
+                    if entry.is_dir()
+                }
+        raise ValueError(
+            f"VPK packages can only be read from zipped or unzipped (a folder) sources. Instead got {repr(str(path))}"
+        )
 
+    @classmethod
+    def _load(cls, path_: ZipPathPlus) -> Vpk:
+        """`path_` to the root of the VPK package, already opened if zipped."""
         manifest_path = path_ / "vaultpackage.xml"
         if not manifest_path.exists():
             raise FileNotFoundError(
                 f"Could not find manifest file in {repr(str(manifest_path))}."
             )
+        return cls(
+            manifest=Manifest(manifest_path.read_bytes()),
+            components=cls._load_components(path_),
+            codes=_load_in_parallel(JavaSdkCode.load, java_paths(path_)),
+        )
+
+    @staticmethod
+    def _load_components(path_: ZipPathPlus) -> list[Component]:
+        """`path_` to the root of the VPK package, already opened if zipped."""
+        if isinstance(path_, ZipPath):
+            index = index_zip_components(path_.root)
+
+            def load(component_dir: ZipPathPlus) -> Component:
+                # `component_dir` may have been re-rooted onto another handle of
+                # the archive, which its children then ought to use too
+                assert isinstance(component_dir, ZipPath)
+                children: dict[str, ZipPathPlus] = {
+                    suffix: ZipPath(component_dir.root, name)
+                    for suffix, name in index[component_dir.at].items()
+                }
+                return load_component(component_dir, children)
+
+            zip_dirs: list[ZipPathPlus] = [ZipPath(path_.root, at) for at in index]
+            return _load_in_parallel(load, zip_dirs)
         components_dir = path_ / "components"
-        components: list[Component] = []
-        for component_dir in (
-            [] if not components_dir.exists() else components_dir.iterdir()
-        ):
-            component: DataComponent | ConfigurationComponent
-            if not component_dir.is_dir():
-                # This should be unnecessary as per the specs, but people
-                # edit VPK files in MacOS, which leaves behind stuff like
+        if not components_dir.exists():
+            return []
+        # `os.scandir` tells folders apart from the directory listing itself,
+        # without a `stat` call per entry as `Path.is_dir` does
+        with os.scandir(components_dir) as entries:
+            component_dirs: list[ZipPathPlus] = [
+                # The `is_dir` check should be unnecessary as per the specs, but
+                # people edit VPK files in MacOS, which leaves behind stuff like
                 # `.DS_Store` files
-                continue
-            if is_data_component(component_dir):
-                component = DataComponent.load(component_dir)
-            elif is_configuration_component(component_dir):
-                component = ConfigurationComponent.load(component_dir)
-            else:
-                raise ValueError(
-                    f"{str(component_dir)} is neither a data nor a configuration component."
-                )
-            components.append(component)
-        # Sadly `zipfile.Path` does not implement `pathlib.Path.rglob`, so we
-        # are forced to recurse manually
-        codes: list[JavaSdkCode] = []
-        q: deque[ZipPathPlus] = deque(path_.iterdir())
-        while q:
-            p: ZipPathPlus = q.popleft()
-            if p.is_dir() and (p.name != "__MACOSX"):
-                # Second clause ought to be unnecessary but people edit VPK's
-                # in MacOS, leaving unspec'd stuff behind
-                q.extend(p.iterdir())
-            elif p.suffix == ".java":
-                codes.append(JavaSdkCode.load(p))
+                Path(entry.path)
+                for entry in entries
+                if entry.is_dir()
+            ]
+        return _load_in_parallel(load_component, component_dirs)
 
-        return cls(
-            manifest=Manifest(manifest_path.read_text()),
-            components=components,
-            codes=codes,
-        )
+    @classmethod
+    def transform(
+        cls, src: Path, dst: Path, per_component: Callable[[Component], None]
+    ) -> None:
+        """Apply `per_component` to every component of the zipped VPK package
+        `src`, writing the result to `dst`. Equivalent to loading `src`, modifying
+        its components and dumping it to `dst`; but only the components are
+        parsed and re-serialized. The manifest and Java SDK code are copied over
+        as is, with their original compression settings. Same as `Vpk.load`,
+        anything else (e.g., `__MACOSX` folders) is left behind.
+        """
+        src, dst = Path(src).resolve(), Path(dst).resolve()
+        if not is_zipfile(src):
+            raise ValueError(
+                f"VPK packages can only be transformed from zipped sources. Instead got {repr(str(src))}"
+            )
+        if src == dst:
+            raise ValueError(
+                f"Cannot transform a VPK package in place. Got {repr(str(src))} as both source and destination."
+            )
+        with (
+            _open_zip(src) as src_zip,
+            open(dst, "wb", buffering=_WRITE_BUFFER_SIZE) as dst_file,
+            ZipFile(dst_file, mode="w") as dst_zip,
+        ):
+            try:
+                manifest_info = src_zip.getinfo("vaultpackage.xml")
+            except KeyError:
+                raise FileNotFoundError(
+                    f"Could not find manifest file in {repr(str(src / 'vaultpackage.xml'))}."
+                ) from None
+            dst_zip.writestr(manifest_info, src_zip.read(manifest_info))
+            for component in cls._load_components(ZipPath(src_zip)):
+                per_component(component)
+                for arcname, content in component.entries():
+                    _write_entry(dst_zip, arcname, content)
+            for java_path in java_paths(ZipPath(src_zip)):
+                assert isinstance(java_path, ZipPath)
+                # Renamed the way `Vpk.dump` would, i.e., relative to the
+                # innermost "javasdk" folder
+                code = JavaSdkCode.load(java_path)
+                info = copy(src_zip.getinfo(java_path.at))
+                info.filename = code.path.as_posix()
+                dst_zip.writestr(info, code.content)
 
     def dump(self, path: Path):
         """`path` is the one to the VPK package. E.g., /path/to/package.vpk"""
         path = Path(path).resolve()
-        # For whichever reason, it is considerably faster (by an order of magnitude) to
-        # operate in a temporary directory and add files to the ZIP file individually
-        # with `ZipFile.write`; instead of operating in the temporary directory and
-        # and creating the ZIP file via `shutil.make_archive`.
-        with TemporaryDirectory() as tmp_dir, ZipFile(path, mode="w") as zip_file:
-            tmp_dir_path = Path(tmp_dir).resolve()
-            tmp_vpk = tmp_dir_path / path.stem
-            tmp_vpk.mkdir()
-            # Notice in what follows the "`dump` in one line, `ZipFile.write` in
-            # the following line" pattern. The order matters since the file path
-            # passed to `ZipFile.write` ought to exist
-            manifest_path = self.manifest.dump(tmp_vpk)
-            zip_file.write(
-                str(manifest_path), arcname=str(manifest_path.relative_to(tmp_vpk))
-            )
+        # Every file is serialized straight into the ZIP file, which spares us
+        # writing it to a temporary directory just to read it back with
+        # `ZipFile.write`
+        with (
+            open(path, "wb", buffering=_WRITE_BUFFER_SIZE) as file,
+            ZipFile(file, mode="w") as zip_file,
+        ):
+            _write_entry(zip_file, "vaultpackage.xml", self.manifest.dumps())
             for component in self.components:
                 # TODO: do we want to rename the folders if they have been modified?
-                for p in filter(None, component.dump(tmp_vpk)):
-                    zip_file.write(str(p), arcname=str(p.relative_to(tmp_vpk)))
+                for arcname, content in component.entries():
+                    _write_entry(zip_file, arcname, content)
             # TODO: I'm not sure whether it might be relevant, but it seems as
             # though in most (if not all) scrapped VPK packages the Java SDK
             # files were added first to the zip archive
             # TODO: scrapped VPK packages have added the empty folders to the ZIP
             # archive not only the Java files
             for code in self.codes:
-                code_file_path = code.dump(tmp_vpk)
-                zip_file.write(
-                    str(code_file_path),
-                    arcname=str(code_file_path.relative_to(tmp_vpk)),
-                )
+                _write_entry(zip_file, code.path.as_posix(), code.dumps())
@@ -1,9 +1,22 @@
+import csv
+from io import StringIO
 from pathlib import Path
 import shutil
+import stat
+from zipfile import ZipFile
 
 import pytest
 
-from overpack import Vpk
+import overpack
+from overpack import (
+    ComponentKind,
+    ConfigurationComponent,
+    Data,
+    DataComponent,
+    Mdl,
+    Vpk,
+    md5_hash,
+)
 
 
 vpk_files = list((Path(__file__).parent / "vpk_examples").glob("*.vpk"))
@@ -32,3 +45,152 @@ def test_Vpk_load_from_package(vpk):
 def test_Vpk_load_from_directory(unzipped_vpk):
     Vpk.load(unzipped_vpk)
     assert True
+
+
+def test_Vpk_load_in_parallel(vpk, tmp_path, monkeypatch):
+    shutil.unpack_archive(vpk, tmp_path, "zip")
+    batch_sizes = []
+
+    def load_batch(load, paths):
+        batch_sizes.append(len(paths))
+        return load_batch_(load, paths)
+
+    load_batch_ = overpack._load_batch
+    monkeypatch.setattr(overpack, "_load_batch", load_batch)
+    for path in (vpk, tmp_path):
+        monkeypatch.setattr(overpack, "_MIN_BATCH_SIZE", 1 << 30)
+        expected = Vpk.load(path)
+        assert not batch_sizes
+        monkeypatch.setattr(overpack, "_MIN_BATCH_SIZE", 1)
+        actual = Vpk.load(path)
+        # Lone paths are not worth batching
+        loaded = (len(actual.components), len(actual.codes))
+        assert sum(batch_sizes) == sum(n for n in loaded if n > 1)
+        assert actual.components == expected.components
+        assert actual.codes == expected.codes
+        batch_sizes.clear()
+
+
+def test_Vpk_component_kinds(vpk, tmp_path):
+    expected = {
+        c.number: (
+            ComponentKind.DATA
+            if isinstance(c, DataComponent)
+            else ComponentKind.CONFIGURATION
+        )
+        for c in Vpk.load(vpk).components
+    }
+    assert Vpk.component_kinds(vpk) == expected
+    shutil.unpack_archive(vpk, tmp_path, "zip")
+    assert Vpk.component_kinds(tmp_path) == expected
+
+
+def test_Manifest_parsed(vpk):
+    assert Vpk.load(vpk).manifest.parsed.tag.endswith("vaultpackage")
+
+
+def test_Vpk_load_keeps_line_endings(vpk):
+    with ZipFile(vpk) as zip_file:
+        for component in Vpk.load(vpk).components:
+            if isinstance(component, ConfigurationComponent) and component.mdl:
+                stem = f"{component.component_type_name}.{component.component_name}"
+                arcname = f"components/{component.number}/{stem}.mdl"
+                assert component.mdl.raw == zip_file.read(arcname)
+
+
+def test_ConfigurationComponent_entries_keep_workflows(vpk):
+    with ZipFile(vpk) as zip_file:
+        for component in Vpk.load(vpk).components:
+            if isinstance(component, ConfigurationComponent) and component.workflow:
+                for arcname, content in component.entries():
+                    if arcname.endswith(".json"):
+                        assert content == zip_file.read(arcname)
+
+
+def test_DataComponent_generate_manifest_after_edit(tmp_path):
+    vpk_path = Path(__file__).parent / "vpk_examples" / "KANBAN-BOARD-CONFIG.vpk"
+    shutil.unpack_archive(vpk_path, tmp_path, "zip")
+    csv_path = next((tmp_path / "components").glob("*/*.CSV"))
+    raw = csv_path.read_bytes()
+    csv_path.write_bytes(raw + raw.splitlines(keepends=True)[-1])
+    [component] = [
+        c for c in Vpk.load(tmp_path).components if c.number == csv_path.parent.name
+    ]
+    assert isinstance(component, DataComponent)
+    manifest = component.generate_manifest("o__c", "Object", "Create")
+    assert manifest.parsed.findtext("checksum") == md5_hash(csv_path.read_bytes())
+    assert manifest.parsed.findtext("checksum") != md5_hash(raw)
+    assert manifest.parsed.findtext("datastepheader/recordcount") == str(
+        len(list(csv.DictReader(StringIO(csv_path.read_text()))))
+    )
+
+
+def test_Data_raw_invalidates_cache():
+    data = Data(b"a,b\n1,2\n")
+    assert (data.record_count, data.checksum) == (1, md5_hash(data.raw))
+    data.raw += b"3,4\n"
+    assert (data.record_count, data.checksum) == (2, md5_hash(data.raw))
+    assert data.records == [{"a": "1", "b": "2"}, {"a": "3", "b": "4"}]
+
+
+def test_ConfigurationComponent_generate_md5_after_edit():
+    mdl = Mdl(b"RECREATE Picklist a__c (\n  active(true)\n);\n")
+    component = ConfigurationComponent(
+        number="00010", component_type_name="Picklist", component_name="a__c", mdl=mdl
+    )
+    assert component.generate_md5().hash == md5_hash(mdl.raw)
+    mdl.raw = mdl.raw.replace(b"true", b"false")
+    assert component.generate_md5().hash == md5_hash(mdl.raw)
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        "",
+        "a,b\n",
+        "a,b\n1,2\n3,4\n",
+        'a,b\n"1,\n1",2\n\n3\n4,5,6\n',
+        "a,b\r\n1,2\r\n\r\n3\r\n",
+    ],
+)
+def test_Data_records(raw):
+    data = Data(raw.encode())
+    assert data.records == [
+        {k: "" if v is None else v for k, v in r.items() if k is not None}
+        for r in csv.DictReader(StringIO(raw))
+    ]
+    assert data.record_count == len(data.records)
+    assert list(data.iter_records()) == data.records
+
+
+def test_DataComponent_generate_manifest():
+    component = DataComponent(number="00010", label="A & B", data=Data(b"a,b\n1,2\n"))
+    manifest = component.generate_manifest("o__c", "Object", "Upsert", id_param="a")
+    assert manifest.parsed.findtext("label") == "A & B"
+    assert manifest.parsed.findtext("datastepheader/idparam") == "a"
+    assert manifest.parsed.findtext("datastepheader/recordcount") == "1"
+    assert manifest.parsed.findtext("checksum") == component.data.checksum
+
+
+def test_Vpk_dump_file_modes(vpk, tmp_path):
+    dumped_vpk_path = tmp_path / vpk.name
+    Vpk.load(vpk).dump(dumped_vpk_path)
+    with ZipFile(dumped_vpk_path) as zip_file:
+        for info in zip_file.infolist():
+            assert stat.S_ISREG(info.external_attr >> 16)
+            assert stat.S_IMODE(info.external_attr >> 16) == 0o644
+
+
+def test_Vpk_transform(vpk, tmp_path):
+    transformed_vpk_path = tmp_path / vpk.name
+    Vpk.transform(vpk, transformed_vpk_path, lambda component: None)
+    expected, actual = Vpk.load(vpk), Vpk.load(transformed_vpk_path)
+    assert actual.manifest == expected.manifest
+    assert actual.components == expected.components
+    assert actual.codes == expected.codes
+    dumped_vpk_path = tmp_path / f"dumped-{vpk.name}"
+    expected.dump(dumped_vpk_path)
+    with ZipFile(transformed_vpk_path) as zip_file:
+        names = zip_file.namelist()
+    with ZipFile(dumped_vpk_path) as zip_file:
+        assert names == zip_file.namelist()